@@ -0,0 +1,22 @@
+import numpy as np
+
+# Пакетный расчет когорт отдельно от main.py, чтобы приложение не импортировало NumPy при старте.
+# Правила совпадают с _determine_cohort в main.py
+
+# Векторизованный расчет когорт для пакетной обработки: каждый аргумент — массив одного поля по всем пользователям
+def determine_cohort_batch(fitness_level: np.ndarray, age_category: np.ndarray, training_goal: np.ndarray,
+                           health_status: np.ndarray, training_frequency: np.ndarray,
+                           training_type: np.ndarray) -> np.ndarray:
+    # Приводим входные данные к int32-массивам: иначе для списков `* 10` означало бы повторение списка
+    fitness_level, age_category, training_goal, health_status, training_frequency, training_type = (
+        np.asarray(column, dtype=np.int32)
+        for column in (fitness_level, age_category, training_goal, health_status, training_frequency, training_type)
+    )
+    cohort = fitness_level * 10 + age_category
+    cohort += np.where((training_goal == 4) & (fitness_level == 3), 20, 0)
+    cohort -= np.where(health_status == 3, 10, 0)
+
+    cohort += np.where(training_frequency >= 4, 5, 0)
+    cohort += np.where(np.isin(training_type, (1, 2)) & (health_status == 1), 5, 0)
+
+    return cohort
@@ -0,0 +1,26 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
+
+# Инициализация базы данных
+DATABASE_URL = "sqlite+aiosqlite:///./facilities.db"
+
+Base = declarative_base()
+engine = create_async_engine(DATABASE_URL, query_cache_size=1200)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+# Настройки SQLite для каждого нового соединения: mmap и увеличенный кэш страниц.
+# journal_mode не меняем: он сохраняется в самом файле facilities.db, который лежит в репозитории
+# и монтируется в контейнер одним файлом, а база и так читается только при старте
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 МБ
+    cursor.execute("PRAGMA cache_size=-65536")    # 64 МБ
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+# Создание отсутствующих таблиц и индексов при старте приложения
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
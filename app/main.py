@@ -1,52 +1,42 @@
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from urllib.parse import urljoin
 
 import httpx
-from bs4 import BeautifulSoup
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from sqlalchemy import create_engine, Column, Integer, String, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from selectolax.lexbor import LexborHTMLParser
 from starlette.middleware.cors import CORSMiddleware
 
-# Инициализация базы данных
-DATABASE_URL = "sqlite:///./facilities.db"
-
-Base = declarative_base()
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Модель таблицы в базе данных
-class SportsPlayground(Base):
-    __tablename__ = "sports_playgrounds"
-
-    id = Column(Integer, primary_key=True, index=True)
-    district = Column(String, nullable=False)               # Район
-    site_type = Column(String, nullable=False)              # Вид спортплощадки
-    name = Column(String, nullable=False, index=True)       # Название
-    address = Column(String, nullable=False)                # Адрес
-    photo_url = Column(String)                              # Ссылка на фото
-    model_3d_url = Column(String)                           # Ссылка на 3D модель
-    additional_characteristics = Column(String)             # Доп. характеристики
-    required_fitness_level = Column(String)                 # Необходимый уровень подготовки
-    is_group_activity = Column(Boolean)                     # групповая активность предусмотрена или нет
-    requires_teamwork = Column(Boolean)                     # требует сотрудничество
-    is_accessible_with_limitations = Column(Boolean)        # можно с ограничениями
-
-# Функция получения сессии базы данных
-def get_db():
-    db = SessionLocal()
+from db import SessionLocal, init_db
+from models import SportsPlayground
+
+# Запуск и остановка приложения: порядок шагов важен — схема создается до загрузки справочника
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Общий HTTP-клиент: пул соединений и TLS-сессии переиспользуются между запросами
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
     try:
-        yield db
+        await init_db()
+        await reload_playgrounds()
+        yield
     finally:
-        db.close()
+        await app.state.http.aclose()
 
 # Создаем FastAPI приложение
 app = FastAPI(
     title="Спортивный рекомендационный сервис",
     description="Сервис определяет когортный уровень пользователя и рекомендует спортивные площадки.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(CORSMiddleware,
@@ -56,6 +46,8 @@ app.add_middleware(CORSMiddleware,
 
 # Определяем входные данные
 class UserInput(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     fitness_level: int = Field(..., description="Уровень физической подготовки: 1 (начинающий), 2 (средний), 3 (продвинутый)", example=2)
     age_category: int = Field(..., description="Возрастная категория: 1 (детская), 2 (юношеская), 3 (взрослая), 4 (пожилая)", example=3)
     training_type: int = Field(..., description="Тип тренировок: 1 (силовые), 2 (кардио), 3 (групповые), 4 (индивидуальные)", example=1)
@@ -72,38 +64,56 @@ class UserInput(BaseModel):
     skill_focus: Optional[List[int]] = Field(None, description="Навыки для улучшения: 1 (гибкость), 2 (координация)", example=[1])
     cooperation: bool = Field(..., description="Готовность к сотрудничеству с тренером и другими участниками", example=True)
     budget: Optional[float] = Field(None, description="Бюджет на тренировки", example=5000)
+    district: str = Field(..., description="Район проживания", example="Сормовский")
 
 class Recommendation(BaseModel):
     cohort: int = Field(..., description="Числовое значение когорты", example=33)
     recommended_playgrounds: List[str] = Field(..., description="Рекомендуемые спортплощадки")
 
-# Логика определения когорты
-def determine_cohort(user: UserInput) -> int:
+# Логика определения когорты (зависит только от целочисленных полей, поэтому кэшируется)
+@lru_cache(maxsize=4096)
+def _determine_cohort(fitness_level: int, age_category: int, training_goal: int,
+                      health_status: int, training_frequency: int, training_type: int) -> int:
     cohort = 0
-    cohort += user.fitness_level * 10
-    cohort += user.age_category
-    if user.training_goal == 4 and user.fitness_level == 3:
+    cohort += fitness_level * 10
+    cohort += age_category
+    if training_goal == 4 and fitness_level == 3:
         cohort += 20
-    if user.health_status == 3:
+    if health_status == 3:
         cohort -= 10
 
-    if user.training_frequency >= 4:
+    if training_frequency >= 4:
         cohort += 5
-    if user.training_type in [1, 2] and user.health_status == 1:
+    if training_type in [1, 2] and health_status == 1:
         cohort += 5
 
     return cohort
 
+def determine_cohort(user: UserInput) -> int:
+    return _determine_cohort(user.fitness_level, user.age_category, user.training_goal,
+                             user.health_status, user.training_frequency, user.training_type)
+
+# Справочник площадок держится в памяти: {район: [названия]}.
+# Загружается при старте, после изменения таблицы sports_playgrounds нужно вызвать reload_playgrounds()
+SELECT_PLAYGROUNDS = select(SportsPlayground.district, SportsPlayground.name)
+
+async def reload_playgrounds():
+    playgrounds_by_district: Dict[str, List[str]] = {}
+    async with SessionLocal() as db:
+        result = await db.execute(SELECT_PLAYGROUNDS)
+        for district, name in result:
+            playgrounds_by_district.setdefault(district, []).append(name)
+    app.state.playgrounds_by_district = playgrounds_by_district
+
 # Основной маршрут API
-@app.post("/recommendations", response_model=Recommendation)
-async def get_recommendations(user: UserInput, db: Session = Depends(get_db)):
+@app.post("/recommendations", response_model=Recommendation, response_class=ORJSONResponse)
+async def get_recommendations(user: UserInput):
     try:
         cohort = determine_cohort(user)
-        playgrounds = db.query(SportsPlayground).filter(SportsPlayground.district == user.district).all()
-        recommended_playgrounds = [
-            playground.name for playground in playgrounds
-        ]
-        return Recommendation(cohort=cohort, recommended_playgrounds=recommended_playgrounds)
+        recommended_playgrounds = app.state.playgrounds_by_district.get(user.district, [])
+        recommendation = Recommendation(cohort=cohort, recommended_playgrounds=recommended_playgrounds)
+        # Ответ уже провалидирован моделью выше, поэтому повторная валидация по response_model не нужна
+        return ORJSONResponse(recommendation.model_dump())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка обработки данных: {str(e)}")
 
@@ -111,40 +121,105 @@ async def get_recommendations(user: UserInput, db: Session = Depends(get_db)):
 class URLRequest(BaseModel):
     url: str
 
-@app.post("/api/preview")
+# Для превью скачиваем только начало страницы: Open Graph теги находятся в <head>
+PREVIEW_MAX_BYTES = 65536
+HEAD_END = re.compile(rb"</head\s*>|<body\b", re.IGNORECASE)
+# Атрибуты тега с учетом кавычек: символ ">" внутри значения (например, в alt) не закрывает тег
+TAG_ATTRS = rb"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+META_TAG = re.compile(rb"<meta\b" + TAG_ATTRS + rb">", re.IGNORECASE)
+IMG_START = re.compile(rb"<img\b", re.IGNORECASE)
+IMG_TAG = re.compile(rb"<img\b" + TAG_ATTRS + rb">", re.IGNORECASE)
+OG_IMAGE = re.compile(rb"""property\s*=\s*["']?og:image["'\s/>]""", re.IGNORECASE)
+NON_EMPTY_CONTENT = re.compile(rb"""(?<![\w-])content\s*=\s*(?:"\s*[^"\s]|'\s*[^'\s]|[^"'\s>])""", re.IGNORECASE)
+META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+# Есть ли в <head> og:image с непустым content
+def has_og_image(head: bytes) -> bool:
+    return any(OG_IMAGE.search(tag) and NON_EMPTY_CONTENT.search(tag) for tag in META_TAG.findall(head))
+
+# Загружаем страницу до конца <head>, а если в нем нет og:image — до первого <img> (не более PREVIEW_MAX_BYTES)
+# Возвращает (содержимое, кодировка, упёрлась ли загрузка в лимит)
+async def fetch_page_head(url: str) -> Tuple[bytes, Optional[str], bool]:
+    content = bytearray()
+    head_end = None
+    img_start = None
+    headers = {"Range": f"bytes=0-{PREVIEW_MAX_BYTES - 1}"}
+    async with app.state.http.stream("GET", url, headers=headers) as response:
+        response.raise_for_status()  # Вызывает ошибку, если статус не 2xx
+        async for chunk in response.aiter_bytes():
+            # Искомые теги могут оказаться на границе чанков
+            search_from = max(0, len(content) - 8)
+            content += chunk
+            if head_end is None:
+                match = HEAD_END.search(content, search_from)
+                if match:
+                    head_end = match.start()
+                    if has_og_image(bytes(content[:head_end])):
+                        return bytes(content), response.charset_encoding, False
+            if head_end is not None:
+                if img_start is None:
+                    match = IMG_START.search(content, max(head_end, search_from))
+                    if match:
+                        img_start = match.start()
+                # Ждем конца тега <img>, чтобы атрибут src был загружен целиком
+                if img_start is not None and IMG_TAG.match(content, img_start):
+                    return bytes(content), response.charset_encoding, False
+            if len(content) >= PREVIEW_MAX_BYTES:
+                return bytes(content), response.charset_encoding, True
+    return bytes(content), response.charset_encoding, False
+
+# Кодировка берется из Content-Type, затем из <meta charset>, по умолчанию UTF-8
+def decode_page(content: bytes, charset: Optional[str]) -> str:
+    if not charset:
+        match = META_CHARSET.search(content, 0, 2048)
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return content.decode(charset, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+# Извлечение Open Graph данных, <title> и src первого <img>
+def parse_preview(content: bytes, charset: Optional[str]) -> Tuple[Dict[str, str], Optional[str], Optional[str]]:
+    tree = LexborHTMLParser(decode_page(content, charset))
+    og = {}
+    # Пустые значения пропускаем, чтобы сработали запасные варианты (<title>, первый <img>)
+    for node in tree.css('meta[property^="og:"]'):
+        prop = node.attributes.get("property")
+        content = (node.attributes.get("content") or "").strip()
+        if prop in ("og:title", "og:description", "og:image") and content:
+            og.setdefault(prop, content)
+    title = tree.css_first("title")
+    page_title = title.text() if title is not None else None
+    first_img = tree.css_first("img")  # Первый <img> на странице
+    first_img_src = first_img.attributes.get("src") if first_img is not None else None
+    return og, page_title, first_img_src
+
+@app.post("/api/preview", response_class=ORJSONResponse)
 async def get_url_preview(request: URLRequest):
     try:
         # Проверка, что URL начинается с http или https
         if not request.url.startswith(("http://", "https://")):
             raise HTTPException(status_code=400, detail="Invalid URL format")
 
-        # Получаем HTML-страницу
-        async with httpx.AsyncClient() as client:
-            response = await client.get(request.url, timeout=10)
-        response.raise_for_status()  # Вызывает ошибку, если статус не 200
+        # Получаем и парсим начало HTML-страницы
+        content, charset, truncated = await fetch_page_head(request.url)
+        og, page_title, first_img_src = parse_preview(content, charset)
 
-        # Парсим страницу с помощью BeautifulSoup
-        soup = BeautifulSoup(response.text, "html.parser")
+        # Картинка не нашлась в пределах лимита — нужна полная страница
+        if truncated and not og.get("og:image") and not first_img_src:
+            response = await app.state.http.get(request.url)
+            response.raise_for_status()
+            og, page_title, first_img_src = parse_preview(response.content, response.charset_encoding)
 
-        # Извлечение Open Graph данных
         metadata = {
-            "title": None,
-            "description": None,
-            "image": None
+            "title": og.get("og:title") or page_title or "Без названия",
+            "description": og.get("og:description") or "Описание отсутствует",
+            "image": og.get("og:image")
         }
-        og_title = soup.find("meta", property="og:title")
-        og_description = soup.find("meta", property="og:description")
-        og_image = soup.find("meta", property="og:image")
-
-        metadata["title"] = og_title["content"] if og_title else soup.title.string if soup.title else "Без названия"
-        metadata["description"] = og_description["content"] if og_description else "Описание отсутствует"
-        metadata["image"] = og_image["content"] if og_image else None
-
-        # Если og:image не найден, ищем первое встречное изображение
-        if not metadata["image"]:
-            first_img = soup.find("img")  # Ищем первый <img>
-            if first_img and first_img.get("src"):
-                metadata["image"] = urljoin(request.url, first_img["src"])  # Делаем URL абсолютным
+
+        # Если og:image не найден, берем первое встречное изображение
+        if not metadata["image"] and first_img_src:
+            metadata["image"] = urljoin(request.url, first_img_src)  # Делаем URL абсолютным
 
         return metadata
 
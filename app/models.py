@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Index, Integer, String, Boolean
+
+from db import Base
+
+# Модель таблицы в базе данных
+class SportsPlayground(Base):
+    __tablename__ = "sports_playgrounds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    district = Column(String, nullable=False)               # Район
+    site_type = Column(String, nullable=False)              # Вид спортплощадки
+    name = Column(String, nullable=False, index=True)       # Название
+    address = Column(String, nullable=False)                # Адрес
+    photo_url = Column(String)                              # Ссылка на фото
+    model_3d_url = Column(String)                           # Ссылка на 3D модель
+    additional_characteristics = Column(String)             # Доп. характеристики
+    required_fitness_level = Column(String)                 # Необходимый уровень подготовки
+    is_group_activity = Column(Boolean)                     # групповая активность предусмотрена или нет
+    requires_teamwork = Column(Boolean)                     # требует сотрудничество
+    is_accessible_with_limitations = Column(Boolean)        # можно с ограничениями
+
+    # Покрывающий индекс: выборка названий по району не обращается к таблице
+    __table_args__ = (
+        Index("ix_playgrounds_district_name", "district", "name"),
+    )
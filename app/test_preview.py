@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+
+
+# Отдает страницу чанками по chunk_size байт; возвращает (ответ эндпоинта, заголовки Range запросов, прочитано байт)
+def preview(page: bytes, chunk_size: int = 16):
+    ranges = []
+    sent = [0]
+
+    async def chunks():
+        for i in range(0, len(page), chunk_size):
+            sent[0] += chunk_size
+            yield page[i:i + chunk_size]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ranges.append(request.headers.get("range"))
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=chunks())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            main.app.state.http = client
+            return await main.get_url_preview(main.URLRequest(url="http://a/page"))
+
+    return asyncio.run(run()), ranges, sent[0]
+
+
+def test_og_image_in_head_stops_before_body():
+    page = (b'<html><head><title>T</title><meta property="og:image" content="http://i/og.png"></head>'
+            b"<body>" + b"x" * 100000 + b"</body></html>")
+    metadata, ranges, sent = preview(page)
+    assert metadata["image"] == "http://i/og.png"
+    assert len(ranges) == 1
+    assert sent < 1000
+
+
+def test_empty_og_image_falls_back_to_body_img():
+    page = (b'<html><head><title>T</title><meta property="og:image" content=""></head>'
+            b'<body><img src="/body.png">' + b"x" * 100000 + b"</body></html>")
+    metadata, ranges, _ = preview(page)
+    assert metadata["image"] == "http://a/body.png"
+    assert ranges == [f"bytes=0-{main.PREVIEW_MAX_BYTES - 1}"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 16, 4096])
+def test_img_fallback_is_read_from_the_same_stream(chunk_size):
+    page = (b"<html><head><title>Plain</title></head><body><p>" + b"x" * 5000 +
+            b'</p><img alt="a > b" src="/a.png"><p>' + b"y" * 100000 + b"</p></body></html>")
+    metadata, ranges, sent = preview(page, chunk_size)
+    assert metadata == {"title": "Plain", "description": "Описание отсутствует", "image": "http://a/a.png"}
+    assert len(ranges) == 1
+    assert sent < 6000 + chunk_size
+
+
+def test_page_without_head_end():
+    metadata, ranges, _ = preview(b"<title>NoHead</title><body><img src=n.png>" + b"w" * 100000)
+    assert metadata["title"] == "NoHead"
+    assert metadata["image"] == "http://a/n.png"
+    assert len(ranges) == 1
+
+
+def test_img_beyond_limit_refetches_full_page():
+    page = b"<html><head><title>Late</title></head><body>" + b"q" * 100000 + b"<img src='late.png'></body></html>"
+    metadata, ranges, _ = preview(page)
+    assert metadata["image"] == "http://a/late.png"
+    assert ranges == [f"bytes=0-{main.PREVIEW_MAX_BYTES - 1}", None]